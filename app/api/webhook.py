@@ -7,6 +7,10 @@ from app.config import settings
 from app.schemas.models import EvaluationPayload, TaskRequest, TaskResponse
 from app.services.code_generator import CodeGenerator
 from app.services.github_service import GitHubService
+from app.services.llm_service import describe_llm, select_model
+from app.services.run_ledger import run_ledger
+from app.services.task_trace import TaskRecorder, TaskReplayer
+from app.services.warmup_service import warmup_manager
 
 router = APIRouter()
 
@@ -33,16 +37,46 @@ async def receive_task(request: TaskRequest, background_tasks: BackgroundTasks):
     return response
 
 
-async def process_task(request: TaskRequest):
+async def process_task(request: TaskRequest, replayer: TaskReplayer | None = None):
     """
-    Background task processor
+    Background task processor.
+    When a replayer is given, services are served from a recorded trace offline.
     """
+    recorder = None
+    if replayer is None and settings.task_trace_enabled:
+        recorder = TaskRecorder(request)
+    run = None
+    index_html = ""
+    attempts = 0
+    submitted = False
+
     try:
         print(f"🚀 Processing task: {request.task} (Round {request.round})", flush=True)
+        warmup_manager.task_started()
 
         # Initialize services
-        github_service = GitHubService(settings.github_token)
-        code_generator = CodeGenerator()
+        if replayer:
+            github_service = replayer.wrap("github", GitHubService)
+            code_generator = replayer.wrap("code_generator", CodeGenerator)
+            submit = replayer.wrap("evaluation", submit_to_evaluation)
+        else:
+            github_service = GitHubService(settings.github_token)
+            model = await asyncio.to_thread(
+                select_model, request.brief, request.checks, request.round
+            )
+            code_generator = CodeGenerator(model=model)
+            submit = submit_to_evaluation
+            run = run_ledger.start_run(
+                request.task,
+                request.round,
+                *describe_llm(code_generator.llm),
+                brief=request.brief,
+                checks=request.checks,
+            )
+            if recorder:
+                github_service = recorder.wrap("github", github_service)
+                code_generator = recorder.wrap("code_generator", code_generator)
+                submit = recorder.wrap("evaluation", submit)
 
         # Step 1: Generate application code
         print("📝 Generating application code...", flush=True)
@@ -54,7 +88,10 @@ async def process_task(request: TaskRequest):
         # Step 2: Generate README
         print("📄 Generating README...", flush=True)
         readme_md = await code_generator.generate_readme(
-            task_id=request.task, brief=request.brief
+            task_id=request.task,
+            brief=request.brief,
+            index_html=index_html,
+            checks=request.checks,
         )
         print("✅ README generation complete!", flush=True)
 
@@ -69,7 +106,7 @@ async def process_task(request: TaskRequest):
 
         # Step 4: Submit to evaluation URL
         print("📤 Submitting to evaluation URL...", flush=True)
-        await submit_to_evaluation(
+        submitted, attempts = await submit(
             evaluation_url=request.evaluation_url,
             email=request.email,
             task=request.task,
@@ -80,13 +117,42 @@ async def process_task(request: TaskRequest):
             pages_url=git_result["pages_url"],
         )
 
-        print(f"✅ Task {request.task} completed successfully!", flush=True)
+        if submitted:
+            print(f"✅ Task {request.task} completed successfully!", flush=True)
+        else:
+            print(f"⚠️ Task {request.task} deployed but not submitted", flush=True)
+        if run:
+            await asyncio.to_thread(
+                run_ledger.finish_run,
+                run,
+                success=submitted,
+                html_valid=_looks_like_html(index_html),
+                retries=max(attempts - 1, 0),
+                error=None if submitted else "evaluation submission failed",
+            )
 
     except Exception as e:
         print(f"❌ Error processing task {request.task}: {e}", flush=True)
         import traceback
 
         traceback.print_exc()
+        if run:
+            await asyncio.to_thread(
+                run_ledger.finish_run,
+                run,
+                success=False,
+                html_valid=_looks_like_html(index_html),
+                retries=max(attempts - 1, 0),
+                error=str(e)[:500],
+            )
+
+    finally:
+        warmup_manager.task_finished()
+        if recorder:
+            try:
+                recorder.save()
+            except Exception as e:
+                print(f"⚠️ Could not save task trace: {e}", flush=True)
 
 
 async def submit_to_evaluation(
@@ -99,9 +165,10 @@ async def submit_to_evaluation(
     commit_sha: str,
     pages_url: str,
     max_retries: int = 5,
-):
+) -> tuple[bool, int]:
     """
     Submit results to evaluation URL with exponential backoff retry
+    Returns: (whether the submission was accepted, number of attempts made)
     """
     payload = EvaluationPayload(
         email=email,
@@ -125,7 +192,7 @@ async def submit_to_evaluation(
 
                 if response.status_code == 200:
                     print(f"✅ Successfully submitted to evaluation URL", flush=True)
-                    return
+                    return True, attempt + 1
                 else:
                     print(
                         f"⚠️ Evaluation URL returned {response.status_code}: {response.text[:200]}",
@@ -143,3 +210,10 @@ async def submit_to_evaluation(
     print(
         f"⚠️ Could not submit to evaluation URL after {max_retries} attempts", flush=True
     )
+    return False, max_retries
+
+
+def _looks_like_html(code: str) -> bool:
+    """Basic validation of generated code: a complete HTML document"""
+    code = code.lstrip().lower()
+    return code.startswith("<!doctype html") and "</html>" in code
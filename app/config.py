@@ -12,6 +12,14 @@ class LLMProvider(str, Enum):
     AIPIPE = "aipipe"
 
 
+class ReadmeMode(str, Enum):
+    """How README.md is produced"""
+
+    TEMPLATE = "template"  # Local, derived from the generated HTML (no LLM call)
+    ENRICHED = "enriched"  # Local template polished by the LLM
+    LLM = "llm"  # Written entirely by the LLM
+
+
 class Settings(BaseSettings):
     # Your secret from Google Form
     app_secret: str
@@ -42,8 +50,38 @@ class Settings(BaseSettings):
     llm_temperature: float = 0.7
     llm_max_tokens: int = 4096
 
-    # DuckDB path (optional for logging)
+    # Prompt prefix caching. Providers only cache long prefixes (Gemini explicit
+    # caching: 1024+ tokens, 4096 for Pro; OpenAI automatic caching: 1024+ tokens).
+    # The current application instructions (~200 tokens) are below both, so
+    # caching only takes effect once the static prefix grows past them.
+    llm_prompt_cache: bool = True  # Send stable instructions first and reuse them
+    gemini_cache_ttl_seconds: int = 3600  # TTL for Gemini cachedContents
+    ollama_keep_alive: str = "30m"  # Keep the Ollama model (and its KV cache) loaded
+
+    # Startup warm-up and idle keep-alive pings
+    llm_warmup_enabled: bool = True
+    llm_keepalive_interval_seconds: int = 240  # Ping backends after this much idle time
+
+    # README generation
+    readme_mode: ReadmeMode = ReadmeMode.TEMPLATE
+
+    # Record/replay of task executions (opt-in)
+    task_trace_enabled: bool = False
+    task_trace_dir: str = "data/traces"
+
+    # DuckDB run ledger (per-task and per-call latency, tokens, outcomes)
     duckdb_path: str = "data/ai_coder.duckdb"
+    run_ledger_enabled: bool = True
+
+    # Adaptive model selection within the configured provider (uses the run ledger)
+    llm_adaptive_selection: bool = False
+    llm_fast_model: str | None = None  # Small briefs
+    llm_strong_model: str | None = None  # Large briefs and round 2+
+    llm_small_brief_chars: int = 600
+    llm_large_brief_chars: int = 3000
+    llm_min_success_rate: float = 0.8  # Min share of runs with valid HTML and no LLM errors
+    llm_min_history_runs: int = 5  # Runs needed before ledger history is trusted
+    llm_history_days: int = 7  # Only runs this recent count, so skipped models recover
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
 
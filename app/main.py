@@ -1,13 +1,29 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 
 from app.api import webhook
-from app.config import LLMProvider, settings
-from app.services.llm_service import get_llm
+from app.config import settings
+from app.services.llm_service import close_http_client, get_llm, get_model_name
+from app.services.run_ledger import run_ledger
+from app.services.warmup_service import warmup_manager
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up LLM backends on startup, release connections on shutdown"""
+    await warmup_manager.start()
+    yield
+    await warmup_manager.stop()
+    await close_http_client()
+
 
 app = FastAPI(
     title="AI Coder Agent",
     description="LLM-powered code deployment agent for TDS Project",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Include webhook router
@@ -31,6 +47,24 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: 200 only once backend warm-up has finished"""
+    body = {"ready": warmup_manager.ready, "backends": warmup_manager.results}
+    if not warmup_manager.ready:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+
+@app.get("/ledger/stats")
+def ledger_stats():
+    """Aggregate latency and token usage from the run ledger (sync: DuckDB blocks)"""
+    return {
+        "latency_by_model": run_ledger.p95_latency_by_model(),
+        "tokens_per_check": run_ledger.tokens_per_check(),
+    }
+
+
 @app.get("/test-llm")
 async def test_llm():
     """Test the configured LLM"""
@@ -52,13 +86,4 @@ async def test_llm():
 
 def get_current_model_name() -> str:
     """Helper to get current model name"""
-    if settings.llm_provider == LLMProvider.OPENAI:
-        return settings.openai_model
-    elif settings.llm_provider == LLMProvider.GEMINI:
-        return settings.gemini_model
-    elif settings.llm_provider == LLMProvider.AIPIPE:
-        return settings.aipipe_gemini_model
-    elif settings.llm_provider == LLMProvider.OLLAMA:
-        return settings.ollama_model
-    else:
-        return "unknown"
+    return get_model_name()
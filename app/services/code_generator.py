@@ -1,12 +1,29 @@
 from typing import List
 
+from app.config import ReadmeMode, settings
 from app.schemas.models import Attachment
-from app.services.llm_service import get_llm
+from app.services.llm_service import ainvoke_tracked, ainvoke_with_prefix, get_llm
+from app.services.readme_builder import build_readme
+
+# Static instructions sent first on every call so providers can cache the prefix
+APPLICATION_SYSTEM_PROMPT = """You are an expert web developer. Create a complete, production-ready single-page HTML application.
+
+REQUIREMENTS:
+1. Create a SINGLE self-contained HTML file with inline CSS and JavaScript
+2. Use Bootstrap 5 from CDN: https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css
+3. Make it responsive and professional-looking
+4. Include proper error handling and loading states
+5. Ensure ALL checks will pass when tested
+6. Use semantic HTML and clean code structure
+7. Add comments to explain key functionality
+
+CRITICAL: Return ONLY the raw HTML code. No explanations, no markdown formatting, no code blocks. Just the HTML starting with <!DOCTYPE html>.
+"""
 
 
 class CodeGenerator:
-    def __init__(self):
-        self.llm = get_llm()
+    def __init__(self, model: str | None = None):
+        self.llm = get_llm(model)
 
     async def generate_application(
         self, brief: str, checks: List[str], attachments: List[Attachment]
@@ -26,28 +43,17 @@ class CodeGenerator:
             for att in attachments:
                 attachments_text += f"  - {att.name} (data URI provided)\n"
 
-        prompt = f"""You are an expert web developer. Create a complete, production-ready single-page HTML application.
-
-TASK BRIEF:
+        prompt = f"""TASK BRIEF:
 {brief}
 
 EVALUATION CHECKS (your app MUST pass all these):
 {checks_text}
 {attachments_text}
-
-REQUIREMENTS:
-1. Create a SINGLE self-contained HTML file with inline CSS and JavaScript
-2. Use Bootstrap 5 from CDN: https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css
-3. Make it responsive and professional-looking
-4. Include proper error handling and loading states
-5. Ensure ALL checks will pass when tested
-6. Use semantic HTML and clean code structure
-7. Add comments to explain key functionality
-
-CRITICAL: Return ONLY the raw HTML code. No explanations, no markdown formatting, no code blocks. Just the HTML starting with <!DOCTYPE html>.
 """
 
-        response = await self.llm.ainvoke(prompt)
+        response = await ainvoke_with_prefix(
+            self.llm, APPLICATION_SYSTEM_PROMPT, prompt, label="application"
+        )
         code = response.content.strip()
 
         # Clean up markdown formatting if LLM added it
@@ -60,12 +66,48 @@ CRITICAL: Return ONLY the raw HTML code. No explanations, no markdown formatting
 
         return code.strip()
 
-    async def generate_readme(self, task_id: str, brief: str) -> str:
+    async def generate_readme(
+        self,
+        task_id: str,
+        brief: str,
+        index_html: str = "",
+        checks: List[str] | None = None,
+    ) -> str:
         """
         Generate professional README.md content.
+        Uses settings.readme_mode: a local template built from index_html,
+        that template enriched by the LLM, or a README written by the LLM.
         Returns:
             str: README content as string.
         """
+        if settings.readme_mode == ReadmeMode.LLM:
+            return await self._generate_readme_llm(task_id, brief)
+
+        readme = build_readme(task_id, brief, checks or [], index_html)
+        if settings.readme_mode == ReadmeMode.ENRICHED:
+            try:
+                return await self._enrich_readme(readme, brief)
+            except Exception as e:
+                print(f"⚠️ README enrichment failed, using template: {e}", flush=True)
+        return readme
+
+    async def _enrich_readme(self, readme: str, brief: str) -> str:
+        """Ask the LLM to polish a locally generated README"""
+        prompt = f"""Improve this README.md for a web application. Keep every section and all factual details, make the Overview and Features read naturally, and add a short explanation of how the code works under Technical Details.
+
+Brief: {brief}
+
+README:
+{readme}
+
+Return ONLY the README content, no extra text not need of code block for raw Markdown.
+"""
+
+        response = await ainvoke_tracked(self.llm, prompt, label="readme_enrich")
+        return response.content.strip()
+
+    async def _generate_readme_llm(self, task_id: str, brief: str) -> str:
+        """README written entirely by the LLM"""
         prompt = f"""Create a professional README.md for this web application project.
 
 Project ID: {task_id}
@@ -83,5 +125,5 @@ Make it concise, professional, and well-formatted in Markdown.
 Return ONLY the README content, no extra text not need of code block for raw Markdown.
 """
 
-        response = await self.llm.ainvoke(prompt)
+        response = await ainvoke_tracked(self.llm, prompt, label="readme")
         return response.content.strip()
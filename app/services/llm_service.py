@@ -1,3 +1,6 @@
+import hashlib
+import time
+
 import httpx
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
@@ -7,6 +10,27 @@ from langchain_ollama import ChatOllama
 from langchain_openai import ChatOpenAI
 
 from app.config import LLMProvider, settings
+from app.services.run_ledger import record_llm_call, run_ledger
+from app.services.task_trace import record_llm_exchange
+
+# Shared HTTP client so provider connections (DNS, TCP, TLS) stay warm between calls
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide async HTTP client, creating it on first use"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=60.0)
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared HTTP client (called on shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
 
 
 class AIPipeGemini(BaseChatModel):
@@ -43,24 +67,23 @@ class AIPipeGemini(BaseChatModel):
                 )  # FIXED: removed extra quote
 
         # Call AIPipe Gemini endpoint
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"https://aipipe.org/geminiv1beta/models/{self.model}:generateContent",
-                headers={
-                    "Authorization": f"Bearer {self.token}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "contents": contents,
-                    "generationConfig": {
-                        "temperature": self.temperature,
-                        "maxOutputTokens": self.max_tokens,
-                    },
+        response = await get_http_client().post(
+            f"https://aipipe.org/geminiv1beta/models/{self.model}:generateContent",
+            headers={
+                "Authorization": f"Bearer {self.token}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "contents": contents,
+                "generationConfig": {
+                    "temperature": self.temperature,
+                    "maxOutputTokens": self.max_tokens,
                 },
-                timeout=60.0,
-            )
-            response.raise_for_status()
-            result = response.json()
+            },
+            timeout=60.0,
+        )
+        response.raise_for_status()
+        result = response.json()
 
         # Extract response text
         try:
@@ -70,8 +93,19 @@ class AIPipeGemini(BaseChatModel):
                 f"Unexpected AIPipe Gemini response format: {result}"
             ) from e
 
-        # Return in LangChain format
-        message = AIMessage(content=text)
+        # Return in LangChain format, keeping token usage (incl. cached prefix)
+        usage = result.get("usageMetadata", {})
+        message = AIMessage(
+            content=text,
+            usage_metadata={
+                "input_tokens": usage.get("promptTokenCount", 0),
+                "output_tokens": usage.get("candidatesTokenCount", 0),
+                "total_tokens": usage.get("totalTokenCount", 0),
+                "input_token_details": {
+                    "cache_read": usage.get("cachedContentTokenCount", 0)
+                },
+            },
+        )
         generation = ChatGeneration(message=message)
         return ChatResult(generations=[generation])
 
@@ -80,16 +114,52 @@ class AIPipeGemini(BaseChatModel):
         return "aipipe-gemini"
 
 
-def get_llm() -> BaseChatModel:
+def _gemini_model_name(model: str | None = None) -> str:
+    """Gemini model name with the 'models/' prefix the API expects"""
+    gemini_model = model or settings.gemini_model
+    if not gemini_model.startswith("models/"):
+        gemini_model = f"models/{gemini_model}"
+    return gemini_model
+
+
+def get_model_name() -> str:
+    """Default model name of the configured provider"""
+    if settings.llm_provider == LLMProvider.OPENAI:
+        return settings.openai_model
+    elif settings.llm_provider == LLMProvider.GEMINI:
+        return settings.gemini_model
+    elif settings.llm_provider == LLMProvider.AIPIPE:
+        return settings.aipipe_gemini_model
+    elif settings.llm_provider == LLMProvider.OLLAMA:
+        return settings.ollama_model
+    else:
+        return "unknown"
+
+
+# LLM instances by (provider, model), so tasks reuse the SDK clients warmed at startup
+_llm_instances: dict[tuple[str, str], BaseChatModel] = {}
+
+
+def get_llm(model: str | None = None) -> BaseChatModel:
     """
     Returns the configured LLM based on environment settings.
     Supports OpenAI, Google Gemini, AIPipe, and Ollama.
+    model overrides the provider's default model (see select_model).
+    Instances are created once per model and shared, keeping their connections.
     """
+    key = (settings.llm_provider.value, model or get_model_name())
+    if key not in _llm_instances:
+        _llm_instances[key] = _build_llm(model)
+    return _llm_instances[key]
+
+
+def _build_llm(model: str | None = None) -> BaseChatModel:
+    """Create a new LLM client for the configured provider"""
     if settings.llm_provider == LLMProvider.OPENAI:
         if not settings.openai_api_key:
             raise ValueError("OPENAI_API_KEY is required when using OpenAI provider")
         return ChatOpenAI(
-            model=settings.openai_model,
+            model=model or settings.openai_model,
             temperature=settings.llm_temperature,
             api_key=settings.openai_api_key,
         )
@@ -98,13 +168,8 @@ def get_llm() -> BaseChatModel:
         if not settings.google_api_key:
             raise ValueError("GOOGLE_API_KEY is required when using Gemini provider")
 
-        # Fix: Add 'models/' prefix if not present
-        gemini_model = settings.gemini_model
-        if not gemini_model.startswith("models/"):
-            gemini_model = f"models/{gemini_model}"
-
         return ChatGoogleGenerativeAI(
-            model=gemini_model,
+            model=_gemini_model_name(model),
             temperature=settings.llm_temperature,
             max_output_tokens=settings.llm_max_tokens,
             google_api_key=settings.google_api_key,
@@ -115,17 +180,18 @@ def get_llm() -> BaseChatModel:
             raise ValueError("AIPIPE_TOKEN is required when using AIPipe provider")
         return AIPipeGemini(
             token=settings.aipipe_token,
-            model=settings.aipipe_gemini_model,
+            model=model or settings.aipipe_gemini_model,
             temperature=settings.llm_temperature,
             max_tokens=settings.llm_max_tokens,
         )
 
     elif settings.llm_provider == LLMProvider.OLLAMA:
         return ChatOllama(
-            model=settings.ollama_model,
+            model=model or settings.ollama_model,
             temperature=settings.llm_temperature,
             num_predict=settings.llm_max_tokens,
             base_url=settings.ollama_base_url,
+            keep_alive=settings.ollama_keep_alive,
         )
 
     else:
@@ -150,13 +216,9 @@ def get_llm_with_fallback() -> BaseChatModel:
         )
 
     if settings.google_api_key:
-        gemini_model = settings.gemini_model
-        if not gemini_model.startswith("models/"):
-            gemini_model = f"models/{gemini_model}"
-
         llms.append(
             ChatGoogleGenerativeAI(
-                model=gemini_model,
+                model=_gemini_model_name(),
                 temperature=settings.llm_temperature,
                 max_retries=0,
             )
@@ -177,6 +239,7 @@ def get_llm_with_fallback() -> BaseChatModel:
             model=settings.ollama_model,
             temperature=settings.llm_temperature,
             base_url=settings.ollama_base_url,
+            keep_alive=settings.ollama_keep_alive,
         )
     )
 
@@ -188,3 +251,217 @@ def get_llm_with_fallback() -> BaseChatModel:
     if len(llms) > 1:
         return primary_llm.with_fallbacks(llms[1:])
     return primary_llm
+
+
+# Gemini cachedContents keyed by hash of (model, prefix) -> (name or None, expiry)
+_gemini_prefix_cache: dict[str, tuple[str | None, float]] = {}
+
+
+def _gemini_cache_min_tokens(model: str) -> int:
+    """Smallest prompt Gemini accepts for explicit context caching"""
+    return 4096 if "pro" in model else 1024
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for thresholds"""
+    return len(text) // 4
+
+
+async def get_gemini_cached_content(model: str, system_prompt: str) -> str | None:
+    """
+    Return a Gemini cachedContents name holding system_prompt, creating it if needed.
+    Returns None when the prefix can't be cached; prefixes below the model's
+    minimum cacheable size are skipped without a request, other failures are
+    remembered until the TTL runs out.
+    """
+    if _estimate_tokens(system_prompt) < _gemini_cache_min_tokens(model):
+        return None
+
+    key = hashlib.sha256(f"{model}\n{system_prompt}".encode()).hexdigest()
+    now = time.monotonic()
+    cached = _gemini_prefix_cache.get(key)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    ttl = settings.gemini_cache_ttl_seconds
+    name = None
+    try:
+        response = await get_http_client().post(
+            "https://generativelanguage.googleapis.com/v1beta/cachedContents",
+            headers={
+                "x-goog-api-key": settings.google_api_key,
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": model,
+                "systemInstruction": {"parts": [{"text": system_prompt}]},
+                "ttl": f"{ttl}s",
+            },
+            timeout=30.0,
+        )
+        response.raise_for_status()
+        name = response.json()["name"]
+        print(f"💾 Created Gemini context cache: {name}", flush=True)
+    except Exception as e:
+        print(
+            f"ℹ️ Gemini context cache unavailable, sending prefix inline: {e}",
+            flush=True,
+        )
+
+    # Refresh slightly before the server-side entry expires
+    _gemini_prefix_cache[key] = (name, now + max(ttl - 60, 0))
+    return name
+
+
+def get_token_usage(response: BaseMessage) -> dict:
+    """
+    Extract token counts from a LangChain response.
+    Returns: dict with input_tokens, output_tokens, cached_tokens
+    """
+    usage = getattr(response, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    return {
+        "input_tokens": usage.get("input_tokens", 0),
+        "output_tokens": usage.get("output_tokens", 0),
+        "cached_tokens": details.get("cache_read", 0) or 0,
+    }
+
+
+def describe_llm(llm) -> tuple[str, str]:
+    """Provider and model name of an LLM instance, for logging and the run ledger"""
+    if isinstance(llm, AIPipeGemini):
+        return LLMProvider.AIPIPE.value, llm.model
+    if isinstance(llm, ChatGoogleGenerativeAI):
+        return LLMProvider.GEMINI.value, llm.model.removeprefix("models/")
+    if isinstance(llm, ChatOpenAI):
+        return LLMProvider.OPENAI.value, llm.model_name
+    if isinstance(llm, ChatOllama):
+        return LLMProvider.OLLAMA.value, llm.model
+    return settings.llm_provider.value, type(llm).__name__
+
+
+def select_model(brief: str, checks: list[str], round: int) -> str:
+    """
+    Pick a model of the configured provider for a task.
+
+    Routing comes from config: small briefs go to llm_fast_model and large or
+    round 2+ tasks to llm_strong_model. The run ledger only gates that choice
+    over the last llm_history_days: a candidate is skipped when its quality
+    rate (valid HTML, no failed LLM calls) is below llm_min_success_rate, and
+    the fast model also when its recorded p95 latency is no better than the
+    default model's. The default model is the final fallback. Queries DuckDB,
+    so call it from a thread when on the event loop.
+    """
+    default = get_model_name()
+    if not settings.llm_adaptive_selection:
+        return default
+
+    size = len(brief) + sum(len(check) for check in checks)
+    if round > 1 or size >= settings.llm_large_brief_chars:
+        model, fast = settings.llm_strong_model, False
+    elif size <= settings.llm_small_brief_chars:
+        model, fast = settings.llm_fast_model, True
+    else:
+        return default
+    if not model or model == default:
+        return default
+
+    provider = settings.llm_provider.value
+    days = settings.llm_history_days
+    min_runs = settings.llm_min_history_runs
+    try:
+        stats = run_ledger.model_stats(provider, model, days=days)
+        default_stats = (
+            run_ledger.model_stats(provider, default, days=days) if fast else None
+        )
+    except Exception as e:
+        print(f"⚠️ Run ledger query failed, using default model: {e}", flush=True)
+        return default
+
+    if stats is not None and stats["runs"] >= min_runs:
+        if stats["quality_rate"] < settings.llm_min_success_rate:
+            print(
+                f"ℹ️ Skipping {model}: quality rate {stats['quality_rate']:.0%} "
+                f"over {stats['runs']} runs",
+                flush=True,
+            )
+            return default
+        if (
+            default_stats is not None
+            and default_stats["runs"] >= min_runs
+            and stats["p95_latency_s"] is not None
+            and default_stats["p95_latency_s"] is not None
+            and stats["p95_latency_s"] >= default_stats["p95_latency_s"]
+        ):
+            print(
+                f"ℹ️ Skipping {model}: p95 latency {stats['p95_latency_s']:.1f}s "
+                f"is no better than {default} ({default_stats['p95_latency_s']:.1f}s)",
+                flush=True,
+            )
+            return default
+
+    print(f"🎯 Selected model {model} (brief size {size}, round {round})", flush=True)
+    return model
+
+
+async def _ainvoke_recorded(llm: BaseChatModel, messages, label: str) -> BaseMessage:
+    """
+    Invoke the LLM, logging token usage and recording the call in the run ledger
+    and, when tracing is enabled, the exchange in the task trace.
+    """
+    provider, model = describe_llm(llm)
+    started = time.monotonic()
+    try:
+        response = await llm.ainvoke(messages)
+    except Exception as e:
+        latency = time.monotonic() - started
+        record_llm_call(label, provider, model, latency, None, False)
+        record_llm_exchange(label, provider, model, messages, latency, error=e)
+        raise
+    latency = time.monotonic() - started
+
+    usage = get_token_usage(response)
+    record_llm_call(label, provider, model, latency, usage, True)
+    record_llm_exchange(
+        label, provider, model, messages, latency, response.content, usage
+    )
+    print(
+        f"📊 {label}: {model} {latency:.1f}s, tokens input={usage['input_tokens']} "
+        f"(cached={usage['cached_tokens']}) output={usage['output_tokens']}",
+        flush=True,
+    )
+    return response
+
+
+async def ainvoke_tracked(
+    llm: BaseChatModel, prompt: str, label: str = "llm"
+) -> BaseMessage:
+    """Invoke the LLM with a single prompt, recording latency and token usage"""
+    return await _ainvoke_recorded(llm, prompt, label)
+
+
+async def ainvoke_with_prefix(
+    llm: BaseChatModel, system_prompt: str, prompt: str, label: str = "llm"
+) -> BaseMessage:
+    """
+    Invoke the LLM with a stable system prefix followed by the dynamic prompt.
+
+    Keeping static instructions first lets providers reuse them across calls:
+    Gemini through an explicit cachedContents entry, OpenAI through automatic
+    prefix caching, and Ollama through the KV cache of the loaded model, which
+    keep_alive keeps resident between calls.
+    """
+    messages = [SystemMessage(content=system_prompt), HumanMessage(content=prompt)]
+
+    if (
+        settings.llm_prompt_cache
+        and settings.google_api_key
+        and isinstance(llm, ChatGoogleGenerativeAI)
+    ):
+        cached_content = await get_gemini_cached_content(llm.model, system_prompt)
+        if cached_content:
+            # Gemini rejects a system instruction alongside cached content
+            llm = llm.model_copy(update={"cached_content": cached_content})
+            messages = [HumanMessage(content=prompt)]
+
+    return await _ainvoke_recorded(llm, messages, label)
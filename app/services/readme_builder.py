@@ -0,0 +1,258 @@
+import re
+from html.parser import HTMLParser
+from typing import List
+from urllib.parse import urlparse
+
+
+class _HTMLSummaryParser(HTMLParser):
+    """Collects the parts of a generated page that a README describes"""
+
+    def __init__(self):
+        super().__init__()
+        self.title = ""
+        self.headings: List[str] = []
+        self.fields: List[dict] = []  # inputs anywhere in the page
+        self.form_count = 0
+        self.buttons: List[str] = []
+        self.asset_urls: List[str] = []
+        self.inline_scripts = 0
+        self.inline_styles = 0
+        self.has_viewport = False
+        self.labels: dict = {}  # input id -> label text, resolved after parsing
+        self._capture = None  # tag whose text is being collected
+        self._text = ""
+        self._label_for = None
+        self._form = None  # index of the enclosing <form>, if any
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in ("title", "h1", "h2", "h3", "button", "label"):
+            self._capture = tag
+            self._text = ""
+            if tag == "label":
+                self._label_for = attrs.get("for")
+        elif tag == "form":
+            self._form = self.form_count
+            self.form_count += 1
+        elif tag in ("input", "select", "textarea"):
+            if attrs.get("type") in ("hidden", "submit", "button", "reset"):
+                return
+            self.fields.append({"form": self._form, **attrs})
+        elif tag == "script":
+            if attrs.get("src"):
+                self.asset_urls.append(attrs["src"])
+            else:
+                self.inline_scripts += 1
+        elif tag == "style":
+            self.inline_styles += 1
+        elif tag == "link" and attrs.get("rel") == "stylesheet" and attrs.get("href"):
+            self.asset_urls.append(attrs["href"])
+        elif tag == "meta" and attrs.get("name") == "viewport":
+            self.has_viewport = True
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self._form = None
+        if tag != self._capture:
+            return
+        text = " ".join(self._text.split())
+        self._capture = None
+        if not text:
+            return
+        if tag == "title":
+            self.title = text
+        elif tag in ("h1", "h2", "h3"):
+            self.headings.append(text)
+        elif tag == "button":
+            self.buttons.append(text)
+        elif tag == "label" and self._label_for:
+            self.labels[self._label_for] = text
+
+    def handle_data(self, data):
+        if self._capture:
+            self._text += data
+
+
+def _field_name(field: dict, labels: dict) -> str | None:
+    """Human-readable name of a form field"""
+    return (
+        labels.get(field.get("id"))
+        or field.get("aria-label")
+        or field.get("placeholder")
+        or field.get("name")
+        or field.get("id")
+    )
+
+
+# Hosts that serve a known library or font set regardless of the URL path
+_KNOWN_HOSTS = {
+    "fonts.googleapis.com": "Google Fonts",
+    "fonts.gstatic.com": "Google Fonts",
+    "use.fontawesome.com": "Font Awesome",
+    "kit.fontawesome.com": "Font Awesome",
+    "cdn.tailwindcss.com": "Tailwind CSS",
+}
+
+# File stems that say nothing about the library they belong to
+_GENERIC_STEMS = {
+    "all",
+    "app",
+    "bundle",
+    "css",
+    "css2",
+    "index",
+    "js",
+    "loader",
+    "main",
+    "script",
+    "scripts",
+    "style",
+    "styles",
+}
+
+
+def _library_name(url: str) -> str:
+    """Readable library name from a CDN URL"""
+    parsed = urlparse(url if "://" in url else f"https:{url}")
+    host, path = parsed.netloc, parsed.path
+    if host in _KNOWN_HOSTS:
+        return _KNOWN_HOSTS[host]
+    # jsDelivr / unpkg: /npm/<pkg>[@<version>]/... or /<pkg>@<version>/...
+    match = re.search(r"/npm/((?:@[^/]+/)?[^/@]+)", path) or re.search(
+        r"/((?:@[^/]+/)?[^/@]+)@", path
+    )
+    if match:
+        return match.group(1)
+    # cdnjs: /ajax/libs/<pkg>/<version>/...
+    match = re.search(r"/ajax/libs/([^/]+)/", path)
+    if match:
+        return match.group(1)
+    # Plain file, e.g. jquery-3.7.1.min.js -> jquery
+    stem = path.rsplit("/", 1)[-1]
+    stem = re.sub(r"(\.min)?\.(js|mjs|css)$", "", stem)
+    stem = re.sub(r"[-.@]?v?\d+(\.\d+)*$", "", stem)
+    if not stem or stem.lower() in _GENERIC_STEMS:
+        return host
+    return stem
+
+
+def summarize_html(index_html: str) -> dict:
+    """
+    Extract title, headings, forms, inputs, buttons, scripts and libraries.
+    Returns: dict describing the page structure
+    """
+    parser = _HTMLSummaryParser()
+    parser.feed(index_html)
+    parser.close()
+
+    # Labels may follow their input (e.g. Bootstrap form-floating), so names
+    # are resolved only once the whole page has been parsed
+    forms = [[] for _ in range(parser.form_count)]
+    inputs = []
+    for field in parser.fields:
+        name = _field_name(field, parser.labels)
+        if not name:
+            continue
+        if field["form"] is None:
+            inputs.append(name)
+        else:
+            forms[field["form"]].append(name)
+
+    libraries = []
+    local_assets = []
+    for url in parser.asset_urls:
+        parsed = urlparse(url)
+        if parsed.scheme in ("http", "https") or url.startswith("//"):
+            name = _library_name(url)
+            if name and name not in libraries:
+                libraries.append(name)
+        elif not parsed.scheme and url not in local_assets:
+            local_assets.append(url)
+
+    return {
+        "title": parser.title,
+        "headings": list(dict.fromkeys(parser.headings)),
+        "forms": [fields for fields in forms if fields],
+        "inputs": list(dict.fromkeys(inputs)),
+        "buttons": list(dict.fromkeys(parser.buttons)),
+        "libraries": libraries,
+        "local_assets": local_assets,
+        "inline_scripts": parser.inline_scripts,
+        "inline_styles": parser.inline_styles,
+        "responsive": parser.has_viewport,
+    }
+
+
+def build_readme(task_id: str, brief: str, checks: List[str], index_html: str) -> str:
+    """
+    Build README.md deterministically from the brief, checks and generated HTML.
+    Returns:
+        str: README content as string.
+    """
+    summary = summarize_html(index_html)
+    title = (
+        summary["title"]
+        or (summary["headings"][0] if summary["headings"] else "")
+        or task_id.replace("-", " ").replace("_", " ").title()
+    )
+
+    lines = [f"# {title}", "", "## Overview", "", brief.strip(), ""]
+
+    features = [f"- {heading}" for heading in summary["headings"][:8]]
+    for fields in summary["forms"]:
+        features.append(f"- Form with fields: {', '.join(fields)}")
+    if summary["inputs"]:
+        features.append(f"- Inputs: {', '.join(summary['inputs'][:8])}")
+    if summary["buttons"]:
+        features.append(f"- Actions: {', '.join(summary['buttons'][:8])}")
+    if summary["responsive"]:
+        layout = "Bootstrap " if "bootstrap" in summary["libraries"] else ""
+        features.append(f"- Responsive {layout}layout for desktop and mobile")
+    if features:
+        lines += ["## Features", ""] + features + [""]
+
+    if checks:
+        lines += ["## Requirements", ""]
+        lines += [f"- {check}" for check in checks]
+        lines += [""]
+
+    lines += [
+        "## Usage",
+        "",
+        "1. Open the GitHub Pages URL for this repository, or open `index.html` "
+        "directly in a modern browser.",
+    ]
+    step = 2
+    if summary["forms"]:
+        lines.append(f"{step}. Fill in the form and submit it.")
+        step += 1
+    if summary["inputs"]:
+        lines.append(f"{step}. Enter values in the input fields.")
+        step += 1
+    if summary["buttons"]:
+        lines.append(f"{step}. Use the on-page controls to interact with the app.")
+    lines.append("")
+
+    inline = [
+        kind
+        for kind, count in (
+            ("CSS", summary["inline_styles"]),
+            ("JavaScript", summary["inline_scripts"]),
+        )
+        if count
+    ]
+    lines += ["## Technical Details", ""]
+    if summary["local_assets"]:
+        assets = ", ".join(f"`{asset}`" for asset in summary["local_assets"])
+        lines.append(f"- `index.html` with local assets: {assets}")
+    else:
+        lines.append("- Single self-contained `index.html`")
+    if inline:
+        lines.append(f"- Inline {' and '.join(inline)}")
+    if summary["libraries"]:
+        lines.append(f"- External libraries: {', '.join(summary['libraries'])}")
+    lines.append("- No build step or server-side code required")
+    lines.append("")
+
+    lines += ["## License", "", "MIT License. See [LICENSE](LICENSE) for details.", ""]
+    return "\n".join(lines)
@@ -0,0 +1,275 @@
+import contextvars
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import duckdb
+
+from app.config import settings
+
+# Run of the task currently being processed, so LLM calls can attach to it
+_current_run: contextvars.ContextVar["TaskRun | None"] = contextvars.ContextVar(
+    "current_task_run", default=None
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    task VARCHAR,
+    round INTEGER,
+    started_at TIMESTAMPTZ,
+    duration_s DOUBLE,
+    provider VARCHAR,
+    model VARCHAR,
+    brief_chars INTEGER,
+    checks INTEGER,
+    llm_calls INTEGER,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    cached_tokens INTEGER,
+    html_valid BOOLEAN,
+    success BOOLEAN,
+    retries INTEGER,
+    error VARCHAR,
+    llm_failures INTEGER
+);
+-- Ledgers created before llm_failures was tracked
+ALTER TABLE runs ADD COLUMN IF NOT EXISTS llm_failures INTEGER;
+CREATE TABLE IF NOT EXISTS llm_calls (
+    task VARCHAR,
+    round INTEGER,
+    created_at TIMESTAMPTZ,
+    label VARCHAR,
+    provider VARCHAR,
+    model VARCHAR,
+    latency_s DOUBLE,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    cached_tokens INTEGER,
+    success BOOLEAN
+);
+"""
+
+
+class TaskRun:
+    """In-memory record of one task execution, written to the ledger when finished"""
+
+    def __init__(
+        self, task: str, round: int, provider: str, model: str, brief: str, checks
+    ):
+        self.task = task
+        self.round = round
+        self.provider = provider
+        self.model = model
+        self.brief_chars = len(brief)
+        self.checks = len(checks)
+        self.calls: list[dict] = []
+        self.started = time.monotonic()
+        self.started_at = datetime.now(timezone.utc)
+
+
+class RunLedger:
+    """
+    DuckDB-backed history of task runs and LLM calls.
+
+    Used for latency/cost reporting and by the adaptive model selection in
+    llm_service. All methods are no-ops when the ledger is disabled. Queries
+    block on DuckDB, so call them from a thread when on the event loop.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self._unavailable = not settings.run_ledger_enabled
+
+    def _connect(self):
+        if self._conn is None and not self._unavailable:
+            try:
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                self._conn = duckdb.connect(self.path)
+                self._conn.execute(_SCHEMA)
+            except Exception as e:
+                print(
+                    f"⚠️ Run ledger disabled, could not open {self.path}: {e}",
+                    flush=True,
+                )
+                self._unavailable = True
+        return self._conn
+
+    def _query(self, sql: str, params: list | None = None) -> list[dict]:
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return []
+            cursor = conn.execute(sql, params or [])
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def start_run(
+        self, task: str, round: int, provider: str, model: str, brief: str, checks
+    ) -> TaskRun:
+        """Begin tracking a task; LLM calls made in this context attach to it"""
+        run = TaskRun(task, round, provider, model, brief, checks)
+        _current_run.set(run)
+        return run
+
+    def finish_run(
+        self,
+        run: TaskRun,
+        success: bool,
+        html_valid: bool = False,
+        retries: int = 0,
+        error: str | None = None,
+    ):
+        """Write the run and its LLM calls to the ledger"""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        run.task,
+                        run.round,
+                        run.started_at,
+                        time.monotonic() - run.started,
+                        run.provider,
+                        run.model,
+                        run.brief_chars,
+                        run.checks,
+                        len(run.calls),
+                        sum(c["input_tokens"] for c in run.calls),
+                        sum(c["output_tokens"] for c in run.calls),
+                        sum(c["cached_tokens"] for c in run.calls),
+                        html_valid,
+                        success,
+                        retries,
+                        error,
+                        sum(not c["success"] for c in run.calls),
+                    ],
+                )
+                if run.calls:
+                    conn.executemany(
+                        "INSERT INTO llm_calls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            [
+                                run.task,
+                                run.round,
+                                c["created_at"],
+                                c["label"],
+                                c["provider"],
+                                c["model"],
+                                c["latency_s"],
+                                c["input_tokens"],
+                                c["output_tokens"],
+                                c["cached_tokens"],
+                                c["success"],
+                            ]
+                            for c in run.calls
+                        ],
+                    )
+            except Exception as e:
+                print(f"⚠️ Could not write run ledger: {e}", flush=True)
+
+    def model_stats(
+        self, provider: str, model: str, days: int, window: int = 50
+    ) -> dict | None:
+        """
+        Quality and latency of a model's most recent runs in the last days.
+
+        Only outcomes the model is responsible for count: a run is good when
+        its HTML was valid and none of its LLM calls failed. Submission and
+        GitHub results stay in the runs table for reporting, so an outage of
+        those services doesn't count against the model. The time bound lets a
+        model that was skipped for poor results be tried again once its old
+        runs age out.
+        Returns: dict with runs, quality_rate, p95_latency_s (application
+        calls), or None without history
+        """
+        rows = self._query(
+            """
+            SELECT count(*) AS runs,
+                   avg(CASE WHEN html_valid AND coalesce(llm_failures, 0) = 0
+                       THEN 1.0 ELSE 0.0 END) AS quality_rate,
+                   (
+                       SELECT quantile_cont(latency_s, 0.95) FROM llm_calls
+                       WHERE provider = ? AND model = ?
+                         AND label = 'application' AND success
+                         AND created_at >= now() - to_days(CAST(? AS INTEGER))
+                   ) AS p95_latency_s
+            FROM (
+                SELECT * FROM runs
+                WHERE provider = ? AND model = ? AND llm_calls > 0
+                  AND started_at >= now() - to_days(CAST(? AS INTEGER))
+                ORDER BY started_at DESC LIMIT ?
+            )
+            """,
+            [provider, model, days, provider, model, days, window],
+        )
+        if not rows or not rows[0]["runs"]:
+            return None
+        return rows[0]
+
+    def p95_latency_by_model(self) -> list[dict]:
+        """p50/p95 LLM call latency and call counts per provider and model"""
+        return self._query(
+            """
+            SELECT provider, model, label,
+                   count(*) AS calls,
+                   quantile_cont(latency_s, 0.5) AS p50_latency_s,
+                   quantile_cont(latency_s, 0.95) AS p95_latency_s,
+                   avg(CASE WHEN success THEN 1.0 ELSE 0.0 END) AS success_rate
+            FROM llm_calls
+            GROUP BY provider, model, label
+            ORDER BY provider, model, label
+            """
+        )
+
+    def tokens_per_check(self) -> list[dict]:
+        """Average tokens spent per evaluation check, per provider and model"""
+        return self._query(
+            """
+            SELECT provider, model,
+                   count(*) AS runs,
+                   sum(input_tokens + output_tokens) / nullif(sum(checks), 0)
+                       AS tokens_per_check,
+                   sum(cached_tokens) / nullif(sum(input_tokens), 0)
+                       AS cached_input_ratio
+            FROM runs
+            GROUP BY provider, model
+            ORDER BY provider, model
+            """
+        )
+
+
+def record_llm_call(
+    label: str,
+    provider: str,
+    model: str,
+    latency_s: float,
+    usage: dict | None,
+    success: bool,
+):
+    """Attach an LLM call to the task run in progress (ignored outside a task)"""
+    run = _current_run.get()
+    if run is None:
+        return
+    usage = usage or {}
+    run.calls.append(
+        {
+            "created_at": datetime.now(timezone.utc),
+            "label": label,
+            "provider": provider,
+            "model": model,
+            "latency_s": latency_s,
+            "input_tokens": usage.get("input_tokens", 0),
+            "output_tokens": usage.get("output_tokens", 0),
+            "cached_tokens": usage.get("cached_tokens", 0),
+            "success": success,
+        }
+    )
+
+
+run_ledger = RunLedger(settings.duckdb_path)
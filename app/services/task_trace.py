@@ -0,0 +1,373 @@
+import argparse
+import asyncio
+import builtins
+import contextvars
+import functools
+import gzip
+import hashlib
+import inspect
+import json
+import re
+import time
+from pathlib import Path
+
+from app.config import settings
+from app.schemas.models import TaskRequest
+
+# Nesting depth of recorded calls; only top-level calls are served on replay
+_call_depth: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "task_trace_call_depth", default=0
+)
+
+# Recorder of the task currently being processed, so LLM calls can attach to it
+_current_recorder: contextvars.ContextVar["TaskRecorder | None"] = (
+    contextvars.ContextVar("current_task_recorder", default=None)
+)
+
+
+def _jsonable(value):
+    """Convert a value to something json.dumps accepts, summarizing the rest"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return {"__repr__": repr(value)[:200]}
+
+
+def _size(value) -> int:
+    """Size in bytes of the JSON form of a recorded value"""
+    return len(json.dumps(value, ensure_ascii=False).encode())
+
+
+# Strings at least this long are stored once in the trace's blob table
+_BLOB_MIN_CHARS = 1024
+
+
+class ReplayedCallError(Exception):
+    """Recorded error whose exception type can't be rebuilt on replay"""
+
+
+class TaskRecorder:
+    """
+    Records calls made while processing one task into a gzip-compressed trace.
+
+    Wrapped services keep working normally; each call is logged with its
+    arguments, result (or error), duration and payload sizes. Calls made from
+    inside another recorded call are kept for profiling but marked as nested,
+    including every LLM exchange (see record_llm_exchange).
+    """
+
+    def __init__(self, request: TaskRequest):
+        self.request = request
+        self.events: list[dict] = []
+        self.blobs: dict[str, str] = {}
+        _current_recorder.set(self)
+        self.started = time.monotonic()
+        self.started_at = time.time()
+
+    def wrap(self, component: str, target):
+        """
+        Record calls to target.
+        Functions are returned wrapped; for objects every public method is
+        replaced on the instance so calls between its own methods are seen too.
+        """
+        if inspect.isfunction(target) or inspect.ismethod(target):
+            return self._wrap_callable(component, target.__name__, target)
+
+        for name in dir(target):
+            if name.startswith("_"):
+                continue
+            attr = getattr(target, name)
+            if inspect.ismethod(attr):
+                setattr(target, name, self._wrap_callable(component, name, attr))
+        return target
+
+    def _intern(self, value):
+        """
+        Replace large strings with a reference into the blob table.
+        The generated HTML and attachment data URIs are passed between several
+        calls; by content hash each is stored only once per trace.
+        """
+        if isinstance(value, str) and len(value) >= _BLOB_MIN_CHARS:
+            key = hashlib.sha256(value.encode()).hexdigest()[:16]
+            self.blobs.setdefault(key, value)
+            return {"__blob__": key}
+        if isinstance(value, dict):
+            return {k: self._intern(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._intern(v) for v in value]
+        return value
+
+    def _wrap_callable(self, component: str, name: str, fn):
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                event, token = self._start(component, name, True, args, kwargs)
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception as e:
+                    self._finish(event, token, error=e)
+                    raise
+                self._finish(event, token, result=result)
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def sync_wrapper(*args, **kwargs):
+            event, token = self._start(component, name, False, args, kwargs)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self._finish(event, token, error=e)
+                raise
+            self._finish(event, token, result=result)
+            return result
+
+        return sync_wrapper
+
+    def _start(self, component, name, is_async, args, kwargs):
+        depth = _call_depth.get()
+        token = _call_depth.set(depth + 1)
+        call_args = _jsonable(list(args))
+        call_kwargs = _jsonable(kwargs)
+        event = {
+            "component": component,
+            "method": name,
+            "async": is_async,
+            "depth": depth,
+            "offset": round(time.monotonic() - self.started, 4),
+            "args": self._intern(call_args),
+            "kwargs": self._intern(call_kwargs),
+            "input_bytes": _size([call_args, call_kwargs]),
+        }
+        event["_t0"] = time.monotonic()
+        # Appended on entry so events stay in call order
+        self.events.append(event)
+        return event, token
+
+    def _finish(self, event, token, result=None, error=None):
+        event["duration"] = round(time.monotonic() - event.pop("_t0"), 4)
+        _call_depth.reset(token)
+        if error is not None:
+            event["error_type"] = type(error).__name__
+            event["error"] = str(error)
+        else:
+            result = _jsonable(result)
+            event["result"] = self._intern(result)
+            event["output_bytes"] = _size(result)
+
+    def save(self) -> Path:
+        """Write the trace to task_trace_dir and return its path"""
+        trace_dir = Path(settings.task_trace_dir)
+        trace_dir.mkdir(parents=True, exist_ok=True)
+        # The task id comes from the webhook request; keep it inside trace_dir
+        task = re.sub(r"[^\w.-]", "_", self.request.task).lstrip(".") or "task"
+        path = trace_dir / (
+            f"{task}-r{self.request.round}-{int(self.started_at)}.json.gz"
+        )
+
+        trace = {
+            "request": self._intern(
+                self.request.model_dump(mode="json", exclude={"secret"})
+            ),
+            "started_at": self.started_at,
+            "duration": round(time.monotonic() - self.started, 4),
+            "events": self.events,
+            "blobs": self.blobs,
+        }
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(trace, f, ensure_ascii=False, separators=(",", ":"))
+
+        print(f"🎞️ Saved task trace: {path}", flush=True)
+        return path
+
+
+def record_llm_exchange(
+    label: str,
+    provider: str,
+    model: str,
+    messages,
+    latency_s: float,
+    content=None,
+    usage: dict | None = None,
+    error: Exception | None = None,
+):
+    """
+    Add an LLM exchange to the task trace in progress (ignored outside a task).
+    Stores the messages actually sent and the raw model output, as a nested
+    event under the CodeGenerator call that made it.
+    """
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return
+
+    if isinstance(messages, str):
+        sent = [{"role": "human", "content": messages}]
+    else:
+        sent = [{"role": m.type, "content": _jsonable(m.content)} for m in messages]
+    event = {
+        "component": "llm",
+        "method": label,
+        "async": True,
+        "depth": max(_call_depth.get(), 1),
+        "offset": round(time.monotonic() - recorder.started - latency_s, 4),
+        "duration": round(latency_s, 4),
+        "provider": provider,
+        "model": model,
+        "args": recorder._intern(sent),
+        "kwargs": {},
+        "input_bytes": _size(sent),
+    }
+    if error is not None:
+        event["error_type"] = type(error).__name__
+        event["error"] = str(error)
+    else:
+        raw = _jsonable(content)
+        event["result"] = recorder._intern(raw)
+        event["output_bytes"] = _size(raw)
+        event["usage"] = usage or {}
+    recorder.events.append(event)
+
+
+class _ReplayComponent:
+    """Stand-in service whose methods return recorded results"""
+
+    def __init__(self, replayer: "TaskReplayer", component: str, spec=None):
+        self._replayer = replayer
+        self._component = component
+        self._spec = spec
+
+    def __getattr__(self, name: str):
+        return self._replayer._replay_callable(
+            self._component, name, getattr(self._spec, name, None)
+        )
+
+
+class TaskReplayer:
+    """
+    Serves recorded top-level calls back in order, without any network access.
+
+    time_scale multiplies the recorded durations: 1.0 preserves the original
+    timing, 0.0 returns immediately.
+    """
+
+    def __init__(self, trace: dict, time_scale: float = 1.0):
+        self.trace = trace
+        self.time_scale = time_scale
+        self.blobs: dict[str, str] = trace.get("blobs", {})
+        self._queues: dict[tuple[str, str], list[dict]] = {}
+        self._is_async: dict[tuple[str, str], bool] = {}
+        for event in trace["events"]:
+            if event["depth"] == 0:
+                key = (event["component"], event["method"])
+                self._queues.setdefault(key, []).append(event)
+                self._is_async[key] = event["async"]
+
+    @classmethod
+    def load(cls, path: str, time_scale: float = 1.0) -> "TaskReplayer":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return cls(json.load(f), time_scale=time_scale)
+
+    def resolve(self, value):
+        """Expand blob references back into the recorded strings"""
+        if isinstance(value, dict):
+            if set(value) == {"__blob__"}:
+                return self.blobs[value["__blob__"]]
+            return {k: self.resolve(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.resolve(v) for v in value]
+        return value
+
+    def wrap(self, component: str, target=None):
+        """
+        Replacement for target backed by the trace (target is never called).
+        target may be a function or a class; it only tells whether methods
+        without a recording are async. Calls fail when made, not when wrapped,
+        so traces of tasks that stopped early still replay up to that point.
+        """
+        if inspect.isfunction(target):
+            return self._replay_callable(component, target.__name__, target)
+        return _ReplayComponent(self, component, target)
+
+    def _next_event(self, component: str, name: str) -> dict:
+        queue = self._queues.get((component, name))
+        if not queue:
+            raise RuntimeError(f"No recorded call left for {component}.{name}")
+        return queue.pop(0)
+
+    def _replay_callable(self, component: str, name: str, spec=None):
+        key = (component, name)
+        if key in self._is_async:
+            is_async = self._is_async[key]
+        else:
+            is_async = inspect.iscoroutinefunction(spec)
+
+        if is_async:
+
+            async def async_replay(*args, **kwargs):
+                event = self._next_event(component, name)
+                await asyncio.sleep(event["duration"] * self.time_scale)
+                return self._outcome(event)
+
+            return async_replay
+
+        def sync_replay(*args, **kwargs):
+            event = self._next_event(component, name)
+            time.sleep(event["duration"] * self.time_scale)
+            return self._outcome(event)
+
+        return sync_replay
+
+    def _outcome(self, event: dict):
+        """Recorded result, or the recorded error raised again"""
+        if "error" in event:
+            error_type = event.get("error_type", "Error")
+            exc_type = getattr(builtins, error_type, None)
+            if isinstance(exc_type, type) and issubclass(exc_type, Exception):
+                raise exc_type(event["error"])
+            raise ReplayedCallError(f"{error_type}: {event['error']}")
+        return self.resolve(event.get("result"))
+
+
+async def replay_trace(path: str, time_scale: float = 1.0) -> float:
+    """
+    Re-run process_task offline against a recorded trace.
+    Returns: wall-clock duration of the replayed run in seconds
+    """
+    # Imported here to avoid a circular import with the webhook module
+    from app.api.webhook import process_task
+
+    replayer = TaskReplayer.load(path, time_scale=time_scale)
+    request = TaskRequest(
+        secret="replay", **replayer.resolve(replayer.trace["request"])
+    )
+
+    started = time.monotonic()
+    await process_task(request, replayer=replayer)
+    duration = time.monotonic() - started
+
+    print(
+        f"🎞️ Replayed {path} in {duration:.2f}s "
+        f"(recorded {replayer.trace['duration']:.2f}s, time scale {time_scale})",
+        flush=True,
+    )
+    return duration
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded task trace")
+    parser.add_argument("trace", help="Path to a .json.gz trace file")
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=1.0,
+        help="Multiplier for recorded call durations (0 = no waiting)",
+    )
+    cli_args = parser.parse_args()
+    asyncio.run(replay_trace(cli_args.trace, time_scale=cli_args.time_scale))
@@ -0,0 +1,155 @@
+import asyncio
+import time
+
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_ollama import ChatOllama
+from langchain_openai import ChatOpenAI
+
+from app.config import settings
+from app.services.llm_service import get_http_client, get_llm, get_model_name
+
+
+class WarmupManager:
+    """
+    Warms up LLM backends at startup and keeps them warm while idle.
+
+    Warm-up creates the shared LLM instances that tasks use (see get_llm) and
+    sends a cheap request through each instance's own SDK client, so the
+    connection a task needs is already open: a models list for OpenAI, a free
+    token count for Gemini, and a model preload with a pinned keep_alive for
+    Ollama. AIPipe and GitHub are pinged over HTTP. Afterwards a background
+    loop repeats the pings when no task is running and none has run for
+    llm_keepalive_interval_seconds.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.results: dict[str, str] = {}
+        self.last_activity = time.monotonic()
+        self.active_tasks = 0
+        self._tasks: list[asyncio.Task] = []
+
+    def mark_activity(self):
+        """Record that the backends were just used (resets the idle timer)"""
+        self.last_activity = time.monotonic()
+
+    def task_started(self):
+        """Register a running task; no keep-alive pings are sent while it runs"""
+        self.active_tasks += 1
+        self.mark_activity()
+
+    def task_finished(self):
+        """Unregister a task and restart the idle timer from its end"""
+        self.active_tasks = max(self.active_tasks - 1, 0)
+        self.mark_activity()
+
+    async def start(self):
+        """Launch warm-up and the keep-alive loop in the background"""
+        if not settings.llm_warmup_enabled:
+            self.ready = True
+            return
+        self._tasks = [
+            asyncio.create_task(self.warm_up()),
+            asyncio.create_task(self._keepalive_loop()),
+        ]
+
+    async def stop(self):
+        """Cancel background work"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def warm_up(self):
+        """Create the shared LLM clients and ping every configured backend once"""
+        started = time.monotonic()
+        print("🔥 Warming up LLM backends...", flush=True)
+
+        await self._ping_all()
+
+        self.ready = True
+        self.mark_activity()
+        print(
+            f"✅ Warm-up finished in {time.monotonic() - started:.1f}s: {self.results}",
+            flush=True,
+        )
+
+    async def _keepalive_loop(self):
+        """Ping backends whenever the service has been idle for a full interval"""
+        interval = settings.llm_keepalive_interval_seconds
+        while True:
+            await asyncio.sleep(interval)
+            if not self.ready or self.active_tasks:
+                continue
+            if time.monotonic() - self.last_activity < interval:
+                continue
+            await self._ping_all()
+            self.mark_activity()
+
+    async def _ping_all(self):
+        """Run all backend pings concurrently and record their outcome"""
+        pings = self._get_pings()
+        outcomes = await asyncio.gather(
+            *(ping() for ping in pings.values()), return_exceptions=True
+        )
+        for name, outcome in zip(pings, outcomes):
+            self.results[name] = (
+                f"error: {outcome}" if isinstance(outcome, Exception) else "ok"
+            )
+
+    def _get_pings(self) -> dict:
+        """Low-cost requests for each configured backend"""
+        pings = {"github": self._ping_github}
+        if settings.aipipe_token:
+            pings["aipipe"] = self._ping_aipipe
+        for model in self._task_models():
+            pings[f"llm:{model}"] = lambda model=model: self._ping_llm(model)
+        return pings
+
+    @staticmethod
+    def _task_models() -> list[str]:
+        """Models tasks can be routed to (see select_model)"""
+        models = [get_model_name()]
+        if settings.llm_adaptive_selection:
+            models += [settings.llm_fast_model, settings.llm_strong_model]
+        return list(dict.fromkeys(m for m in models if m))
+
+    async def _ping_llm(self, model: str):
+        """Open the connection of the shared LLM instance through its own client"""
+        # Building the client (imports, auth, gRPC/HTTP setup) happens off the event loop
+        llm = await asyncio.to_thread(get_llm, model)
+
+        if isinstance(llm, ChatOpenAI):
+            await llm.root_async_client.models.list()
+        elif isinstance(llm, ChatGoogleGenerativeAI):
+            # countTokens is free and uses the same async channel as generation
+            await llm.async_client.count_tokens(
+                request={
+                    "model": llm.model,
+                    "contents": [{"parts": [{"text": "ping"}]}],
+                },
+                retry=None,
+                timeout=10.0,
+            )
+        elif isinstance(llm, ChatOllama):
+            # A generate request without a prompt loads the model and pins keep_alive
+            await llm._async_client.generate(
+                model=llm.model, keep_alive=settings.ollama_keep_alive
+            )
+        # AIPipe goes through the shared HTTP client, warmed by _ping_aipipe
+
+    async def _ping_github(self):
+        # /rate_limit does not count against the API rate limit
+        response = await get_http_client().get(
+            "https://api.github.com/rate_limit",
+            headers={"Authorization": f"Bearer {settings.github_token}"},
+            timeout=10.0,
+        )
+        response.raise_for_status()
+
+    async def _ping_aipipe(self):
+        # Only the connection matters here; any HTTP status means the host is reachable
+        await get_http_client().head("https://aipipe.org/", timeout=10.0)
+
+
+warmup_manager = WarmupManager()